@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+批量图片文案识别命令行工具
+
+不经过钉钉机器人，直接将大量截图转换为文案配置，结果逐条写入JSONL输出文件，
+中断后重新执行同一命令会跳过已完成的图片
+
+用法:
+    python bulk_ocr.py screenshots/ urls.txt --demo-key dmx.nav.home -o result.jsonl
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from exceptions import ConfigurationError, DingTalkStreamError
+from logger import setup_logger
+from services.config_parser import ConfigOutputParser
+from services.image_service import ImageService
+from services.locale_index import LocaleIndex
+
+
+# 目录中会被识别的图片类型
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+class RateLimiter:
+    """线程安全的匀速限流器"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def acquire(self) -> None:
+        """阻塞直到允许发起下一次调用"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def collect_sources(inputs: List[str]) -> List[str]:
+    """
+    展开输入为图片来源列表
+
+    Args:
+        inputs: 图片URL、图片文件、图片目录，或每行一个来源的 .txt 列表文件；
+            列表文件中以 # 开头的行为注释，相对路径相对于列表文件所在目录
+
+    Returns:
+        去重后保持顺序的图片来源
+    """
+    sources: List[str] = []
+    for item in inputs:
+        if item.startswith(('http://', 'https://')):
+            sources.append(item)
+        elif os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_SUFFIXES):
+                        sources.append(os.path.join(root, name))
+        elif item.endswith('.txt'):
+            sources.extend(_read_source_list(item))
+        elif os.path.isfile(item):
+            sources.append(item)
+        else:
+            raise ConfigurationError(f"无法识别的输入: {item}")
+    return list(dict.fromkeys(sources))
+
+
+def _read_source_list(path: str) -> List[str]:
+    """读取列表文件，跳过空行和注释，相对路径按列表文件所在目录解析"""
+    base_dir = os.path.dirname(path)
+    sources: List[str] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            source = line.strip()
+            if not source or source.startswith('#'):
+                continue
+            if not source.startswith(('http://', 'https://')) and not os.path.isabs(source):
+                source = os.path.join(base_dir, source)
+            sources.append(source)
+    return sources
+
+
+def cache_key(source: str, demo_key: str) -> str:
+    """
+    计算识别结果的缓存key
+
+    本地文件按内容哈希，内容相同的截图只识别一次；URL按地址
+    """
+    digest = hashlib.sha256(demo_key.encode('utf-8'))
+    if os.path.isfile(source):
+        with open(source, 'rb') as f:
+            digest.update(f.read())
+    else:
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_checkpoint(output_path: str) -> List[dict]:
+    """
+    读取已有输出文件中成功的记录
+
+    Returns:
+        成功的记录列表
+    """
+    records: List[dict] = []
+    if not os.path.exists(output_path):
+        return records
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断时可能留下写了一半的行
+                continue
+            if record.get('status') == 'ok':
+                records.append(record)
+    return records
+
+
+class BulkRecognizer:
+    """批量识别任务"""
+
+    def __init__(self, image_service: ImageService, demo_key: str, output_path: str, logger: logging.Logger,
+                 workers: int = 4, rate: float = 0.0, locale_index: Optional[LocaleIndex] = None):
+        self.image_service = image_service
+        self.demo_key = demo_key
+        self.output_path = output_path
+        self.logger = logger
+        self.workers = workers
+        self.locale_index = locale_index
+        self._rate_limiter = RateLimiter(rate)
+        self._write_lock = threading.Lock()
+
+    def run(self, sources: List[str]) -> int:
+        """
+        识别所有图片，已完成的直接跳过
+
+        Returns:
+            失败的图片数量
+        """
+        records = [r for r in load_checkpoint(self.output_path) if r.get('demo_key') == self.demo_key]
+        done = {record['cache_key']: record for record in records}
+        done_sources = {record['source'] for record in records}
+
+        # 相同内容的图片合并为一个任务
+        pending: Dict[str, List[str]] = {}
+        for source in sources:
+            if source in done_sources:
+                continue
+            key = cache_key(source, self.demo_key)
+            if key in done:
+                self._write(dict(done[key], source=source, cached=True))
+            else:
+                pending.setdefault(key, []).append(source)
+
+        total = sum(len(group) for group in pending.values())
+        self.logger.info(f"共 {len(sources)} 张图片，已完成 {len(sources) - total} 张，待识别 {total} 张")
+
+        failed = 0
+        finished = 0
+        start_time = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {executor.submit(self._recognize, group[0], key): key for key, group in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                record = future.result()
+                for i, source in enumerate(pending[key]):
+                    self._write(dict(record, source=source, cached=i > 0))
+                if record['status'] != 'ok':
+                    failed += len(pending[key])
+                finished += len(pending[key])
+                self._report_progress(finished, total, failed, start_time)
+        finally:
+            # 中断时丢弃尚未开始的任务，已完成的结果都已落盘
+            executor.shutdown(wait=False, cancel_futures=True)
+        return failed
+
+    def _recognize(self, source: str, key: str) -> dict:
+        """识别单张图片，失败时返回错误记录而不是抛出异常"""
+        self._rate_limiter.acquire()
+        start_time = time.monotonic()
+        record = {'source': source, 'cache_key': key, 'demo_key': self.demo_key}
+        try:
+            text = self.image_service.recognize_text(ImageService.to_image_url(source), self.demo_key)
+            parser = ConfigOutputParser()
+            entries = parser.feed(text) + parser.close()
+            record.update(status='ok', text=text)
+            if self.locale_index:
+                reconciled = self.locale_index.reconcile(entries)
+                entries = reconciled.entries
+                record['reconcile'] = {
+                    'reused': reconciled.reused_count,
+                    'unknown': len(reconciled.unknown),
+                    'replaced': [asdict(change) for change in reconciled.replaced],
+                    'renamed': [asdict(change) for change in reconciled.renamed],
+                    'duplicates': [asdict(entry) for entry in reconciled.duplicates],
+                }
+            record.update(
+                entries=[asdict(entry) for entry in entries],
+                issues=[asdict(issue) for issue in parser.issues],
+            )
+        except Exception as e:
+            record.update(status='error', error=str(e))
+        record['elapsed'] = round(time.monotonic() - start_time, 3)
+        return record
+
+    def _write(self, record: dict) -> None:
+        """追加一条记录并立即落盘，作为断点续跑的检查点"""
+        with self._write_lock:
+            with open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _report_progress(self, finished: int, total: int, failed: int, start_time: float) -> None:
+        """输出进度和吞吐量"""
+        elapsed = time.monotonic() - start_time
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        remaining = (total - finished) / rate if rate > 0 else 0.0
+        self.logger.info(
+            f"进度: {finished}/{total}，失败: {failed}，"
+            f"吞吐量: {rate * 60:.1f} 张/分钟，预计剩余: {remaining:.0f}s"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="批量识别截图中的文案并生成配置")
+    parser.add_argument('inputs', nargs='+', help="图片URL、图片文件、图片目录或每行一个来源的 .txt 列表文件")
+    parser.add_argument('--demo-key', required=True, help="文案key示例，如 dmx.nav.home")
+    parser.add_argument('-o', '--output', default='bulk_ocr_result.jsonl', help="JSONL输出文件，同时作为断点续跑的检查点")
+    parser.add_argument('-w', '--workers', type=int, default=4, help="并发识别数")
+    parser.add_argument('--rate', type=float, default=2.0, help="每秒最多发起的识别请求数，0 表示不限制")
+    parser.add_argument('--locale', action='append', default=[], help="已有文案文件或目录，可多次指定，已存在的文案复用其key")
+    parser.add_argument('--log-level', default=None, help="日志级别，默认读取 LOG_LEVEL")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """主函数"""
+    args = parse_args(argv)
+    logger = None
+
+    try:
+        load_dotenv()
+        logger = setup_logger(level=args.log_level or os.environ.get('LOG_LEVEL', 'INFO'))
+
+        api_key = os.environ.get('DASHSCOPE_API_KEY')
+        if not api_key:
+            raise ConfigurationError("请设置环境变量DASHSCOPE_API_KEY")
+        if args.workers < 1:
+            raise ConfigurationError("--workers 必须大于0")
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        if not os.path.isdir(output_dir):
+            raise ConfigurationError(f"输出目录不存在: {output_dir}")
+
+        image_service = ImageService(logger)
+        image_service.set_api_key(api_key)
+        locale_index = LocaleIndex.from_paths(args.locale, logger) if args.locale else None
+
+        sources = collect_sources(args.inputs)
+        recognizer = BulkRecognizer(
+            image_service, args.demo_key, args.output, logger,
+            workers=args.workers, rate=args.rate, locale_index=locale_index
+        )
+        failed = recognizer.run(sources)
+
+        logger.info(f"批量识别结束，结果文件: {args.output}")
+        if failed:
+            logger.warning(f"{failed} 张图片识别失败，重新执行相同命令即可重试")
+            sys.exit(2)
+
+    except KeyboardInterrupt:
+        if logger:
+            logger.info("程序被用户中断，重新执行相同命令可继续")
+        else:
+            print("程序被用户中断，重新执行相同命令可继续")
+        sys.exit(130)
+    except DingTalkStreamError as e:
+        if logger:
+            logger.error(f"批量识别失败: {str(e)}")
+        else:
+            print(f"批量识别失败: {str(e)}")
+        sys.exit(1)
+    except Exception as e:
+        if logger:
+            logger.error(f"批量识别时出错: {str(e)}")
+            logger.debug("详细错误信息:", exc_info=True)
+        else:
+            print(f"批量识别时出错: {str(e)}")
+            traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
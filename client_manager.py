@@ -10,7 +10,10 @@ from dingtalk_stream import Credential
 
 from config import AppConfig
 from handlers import UniversalMessageHandler
+from profiler import ProfilingHooks
+from services.fair_scheduler import FairScheduler
 from services.image_service import ImageService
+from services.locale_index import LocaleIndex
 
 
 class DingTalkStreamManager:
@@ -20,11 +23,20 @@ class DingTalkStreamManager:
         self.config: AppConfig = config
         self.logger: logging.Logger = logger or logging.getLogger(__name__)
         self._client: Optional[dingtalk_stream.DingTalkStreamClient] = None
+        self._profiling: Optional[ProfilingHooks] = None
         
         # 初始化图片服务
         self.image_service = ImageService(self.logger)
         if self.config.dashscope_api_key:
             self.image_service.set_api_key(self.config.dashscope_api_key)
+        
+        # 按发送者公平调度上游调用
+        self.scheduler = FairScheduler(self.config.max_concurrency, self.config.per_sender_limit)
+        
+        # 加载已有文案索引
+        self.locale_index: Optional[LocaleIndex] = None
+        if self.config.locale_paths:
+            self.locale_index = LocaleIndex.from_paths(self.config.locale_paths, self.logger)
     
     def initialize_client(self) -> dingtalk_stream.DingTalkStreamClient:
         """
@@ -58,7 +70,9 @@ class DingTalkStreamManager:
             raise RuntimeError("客户端尚未初始化")
         
         # 注册通用消息处理器
-        universal_handler = UniversalMessageHandler(self.logger, self.image_service)
+        universal_handler = UniversalMessageHandler(
+            self.logger, self.image_service, self.locale_index, self.scheduler
+        )
         self._client.register_callback_handler(
             dingtalk_stream.graph.GraphMessage.TOPIC,
             universal_handler
@@ -71,6 +85,9 @@ class DingTalkStreamManager:
         if not self._client:
             self.initialize_client()
         
+        if self.config.profiling_enabled or self.config.admin_port:
+            self._start_admin()
+        
         try:
             self.logger.info("启动钉钉Stream客户端...")
             self._client.start_forever()
@@ -78,12 +95,31 @@ class DingTalkStreamManager:
             self.logger.error(f"启动客户端时出错: {str(e)}")
             raise
     
+    def _start_admin(self) -> None:
+        """
+        启动本地管理功能
+        
+        配置了管理端口时提供 /metrics，性能分析钩子仅在 PROFILING_ENABLED 时启用
+        """
+        self._profiling = ProfilingHooks(self.config.profile_dir, self.logger)
+        if self.config.profiling_enabled:
+            self._profiling.install_signal_handlers()
+        if self.config.admin_port:
+            self._profiling.start_server(
+                self.config.admin_port,
+                metrics_provider=self.scheduler.render_metrics,
+                enable_profiling=self.config.profiling_enabled
+            )
+    
     def stop(self) -> None:
         """
         停止客户端
         
         关闭所有连接并清理资源
         """
+        if self._profiling:
+            self._profiling.stop()
+            self._profiling = None
         if self._client:
             try:
                 self.logger.info("正在停止钉钉Stream客户端...")
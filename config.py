@@ -4,8 +4,8 @@
 """
 import os
 import logging
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Optional, List
 from dotenv import load_dotenv
 
 from exceptions import ConfigurationError
@@ -18,6 +18,12 @@ class AppConfig:
     client_secret: str
     log_level: str = "INFO"
     dashscope_api_key: Optional[str] = None
+    locale_paths: List[str] = field(default_factory=list)
+    profiling_enabled: bool = False
+    admin_port: Optional[int] = None
+    profile_dir: str = "profiles"
+    max_concurrency: int = 4
+    per_sender_limit: int = 2
     
     @classmethod
     def from_env(cls) -> 'AppConfig':
@@ -29,15 +35,33 @@ class AppConfig:
         client_secret = os.environ.get('CLIENT_SECRET')
         log_level = os.environ.get('LOG_LEVEL', 'INFO')
         dashscope_api_key = os.environ.get('DASHSCOPE_API_KEY')
+        locale_paths = [p.strip() for p in os.environ.get('LOCALE_PATHS', '').split(',') if p.strip()]
+        profiling_enabled = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        admin_port = os.environ.get('ADMIN_PORT')
+        profile_dir = os.environ.get('PROFILE_DIR', 'profiles')
+        max_concurrency = os.environ.get('MAX_CONCURRENCY', '4')
+        per_sender_limit = os.environ.get('PER_SENDER_LIMIT', '2')
         
         if not client_id or not client_secret:
             raise ConfigurationError("请设置环境变量CLIENT_ID和CLIENT_SECRET")
         
+        if admin_port and not admin_port.isdigit():
+            raise ConfigurationError(f"ADMIN_PORT必须为端口号: {admin_port}")
+        
+        if not max_concurrency.isdigit() or not per_sender_limit.isdigit():
+            raise ConfigurationError("MAX_CONCURRENCY和PER_SENDER_LIMIT必须为整数")
+        
         return cls(
             client_id=client_id,
             client_secret=client_secret,
             log_level=log_level,
-            dashscope_api_key=dashscope_api_key
+            dashscope_api_key=dashscope_api_key,
+            locale_paths=locale_paths,
+            profiling_enabled=profiling_enabled,
+            admin_port=int(admin_port) if admin_port else None,
+            profile_dir=profile_dir,
+            max_concurrency=int(max_concurrency),
+            per_sender_limit=int(per_sender_limit)
         )
     
     def validate(self) -> None:
@@ -71,3 +95,12 @@ class AppConfig:
         # 验证千问API密钥
         if not self.dashscope_api_key:
             raise ConfigurationError("请设置环境变量DASHSCOPE_API_KEY以启用图片文字识别功能")
+            
+        # 验证并发配置
+        if self.max_concurrency < 1 or self.per_sender_limit < 1:
+            raise ConfigurationError("MAX_CONCURRENCY和PER_SENDER_LIMIT必须大于0")
+            
+        # 验证文案文件路径
+        for path in self.locale_paths:
+            if not os.path.exists(path):
+                raise ConfigurationError(f"文案文件路径不存在: {path}")
@@ -3,7 +3,8 @@
 钉钉通用消息处理器模块
 """
 import logging
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, Tuple, Optional, Callable
+import asyncio
 import json
 import time
 import re
@@ -13,15 +14,21 @@ import dingtalk_stream
 
 from exceptions import HandlerError
 from services.image_service import ImageService
+from services.config_parser import ConfigOutputParser, format_config_entries
+from services.fair_scheduler import FairScheduler
+from services.locale_index import LocaleIndex
 
 
 class UniversalMessageHandler(dingtalk_stream.GraphHandler):
     """通用消息处理器 - 详细记录所有请求信息"""
     
-    def __init__(self, logger: logging.Logger = None, image_service: Optional[ImageService] = None):
+    def __init__(self, logger: logging.Logger = None, image_service: Optional[ImageService] = None,
+                 locale_index: Optional[LocaleIndex] = None, scheduler: Optional[FairScheduler] = None):
         super(dingtalk_stream.GraphHandler, self).__init__()
         self.logger = logger or logging.getLogger(__name__)
         self.image_service = image_service
+        self.locale_index = locale_index
+        self.scheduler = scheduler
         self.request_counter = 0
         
 
@@ -55,7 +62,7 @@ class UniversalMessageHandler(dingtalk_stream.GraphHandler):
             self._log_business_data(request, request_id)
             
             # 创建响应
-            response = self._create_response_based_on_request(request, request_id)
+            response = await self._create_response_based_on_request(request, request_id)
             
             processing_time = time.time() - start_time
             self.logger.info(f'[{request_id}] 请求处理完成，耗时: {processing_time:.3f}s')
@@ -179,7 +186,7 @@ class UniversalMessageHandler(dingtalk_stream.GraphHandler):
             except Exception as e:
                 self.logger.warning(f"[{request_id}] 分析业务数据时出错: {str(e)}")
 
-    def _create_response_based_on_request(self, request: GraphRequest, request_id: str) -> GraphResponse:
+    async def _create_response_based_on_request(self, request: GraphRequest, request_id: str) -> GraphResponse:
         """根据请求内容创建响应"""
         try:
             self.logger.info(f"[{request_id}] 创建响应基于请求")
@@ -193,20 +200,18 @@ class UniversalMessageHandler(dingtalk_stream.GraphHandler):
                 return self._create_echo_response(request, request_id)
                 
             content = body_data.get('input', '')
+            sender_key = self._get_sender_key(body_data)
             
             # 提取所有图片URL
             if self.image_service:
-                config_results = self.image_service.extract_image_urls(content)
+                config_results = await self._call_upstream(sender_key, self.image_service.extract_image_urls, content)
                 print(config_results)
                 if config_results:
-                    # 处理所有图片
-                    results = []
-                    for url in config_results['urls']:
-                        try:
-                            text = self.image_service.recognize_text(url, config_results['demoKey'])
-                            results.append(f"```\n{text}\n```")
-                        except Exception as e:
-                            results.append(f"处理图片 {url} 时出错：{str(e)}")
+                    # 并发处理所有图片，上游调用由调度器按发送者公平排队
+                    results = list(await asyncio.gather(*[
+                        self._recognize_image(sender_key, url, config_results['demoKey'], request_id)
+                        for url in config_results['urls']
+                    ]))
 
                     self.logger.info(f"[{results}] 处理图片URL完成")
                     
@@ -220,6 +225,64 @@ class UniversalMessageHandler(dingtalk_stream.GraphHandler):
             self.logger.error(f"[{request_id}] 创建响应时出错: {str(e)}")
             raise HandlerError(f"创建响应时出错: {str(e)}")
 
+    async def _recognize_image(self, sender_key: str, url: str, demo_key: str, request_id: str) -> str:
+        """识别单张图片并格式化结果"""
+        try:
+            text = await self._call_upstream(sender_key, self.image_service.recognize_text, url, demo_key)
+            return f"```\n{self._normalize_config_text(text, request_id)}\n```"
+        except Exception as e:
+            return f"处理图片 {url} 时出错：{str(e)}"
+
+    async def _call_upstream(self, sender_key: str, func: Callable[..., Any], *args: Any) -> Any:
+        """执行上游调用，配置了调度器时按发送者排队"""
+        if self.scheduler:
+            return await self.scheduler.run(sender_key, func, *args)
+        return func(*args)
+
+    @staticmethod
+    def _get_sender_key(body_data: Dict[str, Any]) -> str:
+        """从请求体中提取 发送者:会话 标识，用于公平调度"""
+        def first_value(fields):
+            for field in fields:
+                value = body_data.get(field)
+                if isinstance(value, dict):
+                    value = value.get('id') or value.get('user_id') or json.dumps(value, sort_keys=True)
+                if value:
+                    return str(value)
+            return "unknown"
+        
+        sender = first_value(['user_id', 'user', 'sender', 'from'])
+        conversation = first_value(['chat_id', 'conversation', 'session_id'])
+        return f"{sender}:{conversation}"
+
+    def _normalize_config_text(self, text: str, request_id: str) -> str:
+        """校验识别结果，并用已有文案的规范key替换重复文案"""
+        parser = ConfigOutputParser()
+        entries = parser.feed(text) + parser.close()
+        for issue in parser.issues:
+            self.logger.warning(f"[{request_id}] 丢弃第{issue.line}行识别结果({issue.reason}): {issue.text}")
+        
+        # 解析不出任何配置项时保留模型原文
+        if not entries:
+            return text
+        
+        if self.locale_index:
+            reconciled = self.locale_index.reconcile(entries)
+            entries = reconciled.entries
+            for entry in reconciled.duplicates:
+                self.logger.info(f"[{request_id}] 第{entry.line}行文案「{entry.value}」重复出现，已去重")
+            for change in reconciled.renamed:
+                self.logger.warning(
+                    f"[{request_id}] 第{change.entry.line}行文案「{change.entry.value}」的key {change.original_key} "
+                    f"与已有key冲突，已改为 {change.entry.key}"
+                )
+            self.logger.info(
+                f"[{request_id}] 复用已有文案key {reconciled.reused_count}/{len(entries)} 条"
+                f"{'，全部文案已存在' if reconciled.all_known else ''}"
+            )
+        
+        return format_config_entries(entries)
+
     def _create_text_response(self, text: str, request_id: str) -> GraphResponse:
         """创建文本响应"""
         response = GraphResponse()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+运行时性能分析模块
+
+通过信号或本地管理端口，对运行中的进程按需采集限时的挂钟时间栈采样和内存分配差异，
+未触发时不做任何采样
+"""
+import logging
+import math
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+# 单次采集允许的最长时间（秒）
+MAX_PROFILE_SECONDS = 300
+
+# 性能分析自身线程的名称前缀，采样时跳过
+_THREAD_PREFIX = "profiling-"
+
+
+class _AdminServer(ThreadingHTTPServer):
+    """管理端口服务，请求线程统一命名以便采样时排除"""
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        threading.Thread(
+            target=self.process_request_thread, args=(request, client_address),
+            name=f"{_THREAD_PREFIX}admin-request", daemon=True
+        ).start()
+
+
+class ProfilingHooks:
+    """按需性能分析钩子"""
+
+    def __init__(self, output_dir: str = "profiles", logger: Optional[logging.Logger] = None,
+                 default_seconds: float = 10.0, sample_interval: float = 0.005):
+        self.output_dir = output_dir
+        self.logger = logger or logging.getLogger(__name__)
+        self.default_seconds = default_seconds
+        self.sample_interval = sample_interval
+        self._wall_lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._server: Optional[_AdminServer] = None
+
+    def install_signal_handlers(self) -> None:
+        """
+        安装信号处理器：SIGUSR1 采集栈采样，SIGUSR2 采集内存
+
+        必须在主线程中调用，不支持这两个信号的平台上直接跳过
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            self.logger.warning("当前平台不支持SIGUSR1/SIGUSR2，跳过性能分析信号注册")
+            return
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger_wall_profile())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.trigger_memory_profile())
+        self.logger.info(f"性能分析信号已注册: kill -USR1 {os.getpid()} 采集栈采样, kill -USR2 {os.getpid()} 采集内存")
+
+    def start_server(self, port: int, host: str = "127.0.0.1",
+                     metrics_provider: Optional[Callable[[], str]] = None, enable_profiling: bool = True) -> None:
+        """
+        启动本地管理端口
+
+        enable_profiling 为真时 GET /profile/wall?seconds=N 或 /profile/memory?seconds=N 触发采集，
+        提供 metrics_provider 时 GET /metrics 返回其输出
+
+        Args:
+            port: 监听端口
+            host: 监听地址，默认仅本机
+            metrics_provider: 返回指标文本的函数
+            enable_profiling: 是否允许通过端口触发性能分析
+        """
+        hooks = self
+
+        class _AdminHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                seconds = parse_qs(url.query).get('seconds', [None])[0]
+                try:
+                    seconds = float(seconds) if seconds else None
+                except ValueError:
+                    seconds = math.nan
+                if seconds is not None and not (math.isfinite(seconds) and seconds > 0):
+                    self._reply(400, "seconds 参数必须为正数")
+                    return
+
+                if url.path == '/metrics' and metrics_provider:
+                    self._reply(200, metrics_provider().rstrip("\n"))
+                    return
+                if not enable_profiling:
+                    self._reply(404, "性能分析未启用，请设置 PROFILING_ENABLED=true")
+                    return
+                if url.path == '/profile/wall':
+                    started = hooks.trigger_wall_profile(seconds)
+                elif url.path == '/profile/memory':
+                    started = hooks.trigger_memory_profile(seconds)
+                else:
+                    self._reply(404, "未知路径，可用: /profile/wall, /profile/memory")
+                    return
+
+                if started:
+                    self._reply(202, f"已开始采集，结果将写入 {os.path.abspath(hooks.output_dir)}")
+                else:
+                    self._reply(409, "已有同类采集正在进行")
+
+            def _reply(self, status: int, text: str) -> None:
+                body = (text + "\n").encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                hooks.logger.debug(f"性能分析管理端口请求: {format % args}")
+
+        self._server = _AdminServer((host, port), _AdminHandler)
+        threading.Thread(target=self._server.serve_forever, name=f"{_THREAD_PREFIX}admin", daemon=True).start()
+        self.logger.info(f"性能分析管理端口已启动: http://{host}:{port}")
+
+    def stop(self) -> None:
+        """关闭管理端口"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def trigger_wall_profile(self, seconds: Optional[float] = None) -> bool:
+        """
+        在后台线程中开始一次挂钟时间栈采样
+
+        Returns:
+            是否成功开始，已有采集进行中时返回False
+        """
+        return self._spawn(self._wall_lock, self.capture_wall_profile, seconds)
+
+    def trigger_memory_profile(self, seconds: Optional[float] = None) -> bool:
+        """
+        在后台线程中开始一次内存分配采集
+
+        Returns:
+            是否成功开始，已有采集进行中时返回False
+        """
+        return self._spawn(self._memory_lock, self.capture_memory_profile, seconds)
+
+    def _spawn(self, lock: threading.Lock, target, seconds: Optional[float]) -> bool:
+        """加锁后在守护线程中执行采集"""
+        if not lock.acquire(blocking=False):
+            self.logger.warning("已有同类性能分析正在进行，忽略本次触发")
+            return False
+        if seconds is None or not math.isfinite(seconds) or seconds <= 0:
+            seconds = self.default_seconds
+        seconds = min(seconds, MAX_PROFILE_SECONDS)
+
+        def run():
+            try:
+                target(seconds)
+            except Exception as e:
+                self.logger.error(f"性能分析采集失败: {str(e)}")
+            finally:
+                lock.release()
+
+        threading.Thread(target=run, name=f"{_THREAD_PREFIX}capture", daemon=True).start()
+        return True
+
+    def capture_wall_profile(self, seconds: float) -> str:
+        """
+        对所有线程做限时栈采样，结果写为折叠栈格式（可直接用于火焰图工具）
+
+        这是挂钟时间采样：线程无论在运行还是阻塞等待（如等待上游API、空闲的线程池）都会被计数，
+        每个栈以线程名开头，便于区分事件循环线程和线程池工作线程。性能分析自身的线程不计入
+
+        Args:
+            seconds: 采样时长
+
+        Returns:
+            结果文件路径
+        """
+        self.logger.info(f"开始栈采样（挂钟时间），时长: {seconds}s")
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"thread-{ident}")
+                if name.startswith(_THREAD_PREFIX):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.sample_interval)
+
+        path = self._output_path("wall", "collapsed")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.logger.info(f"栈采样完成，共 {samples} 次采样，结果: {path}")
+        return path
+
+    def capture_memory_profile(self, seconds: float) -> str:
+        """
+        限时跟踪内存分配，写出前后两次快照的差异
+
+        Args:
+            seconds: 跟踪时长
+
+        Returns:
+            差异报告文件路径，结束快照以 tracemalloc 格式另存为 .snapshot 文件
+        """
+        self.logger.info(f"开始内存分配跟踪，时长: {seconds}s")
+        # 进程启动时已开启的跟踪（如 PYTHONTRACEMALLOC）不在此处关闭
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        path = self._output_path("memory", "txt")
+        after.dump(path[:-len(".txt")] + ".snapshot")
+        stats = after.compare_to(before, 'lineno')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# 内存分配差异，时长: {seconds}s\n")
+            for stat in stats[:100]:
+                f.write(f"{stat}\n")
+        self.logger.info(f"内存分配跟踪完成，结果: {path}")
+        return path
+
+    def _output_path(self, kind: str, suffix: str) -> str:
+        """生成结果文件路径"""
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return os.path.join(self.output_dir, f"{kind}_{os.getpid()}_{timestamp}.{suffix}")
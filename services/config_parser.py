@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+配置输出解析模块
+
+将大模型返回的 "key"="value" 文本解析为结构化的配置项
+"""
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+
+# 大模型偶尔会输出全角引号/等号，解析前统一替换为半角
+_PUNCTUATION_TABLE = str.maketrans({
+    '“': '"',
+    '”': '"',
+    '＂': '"',
+    '＝': '=',
+})
+
+# 匹配一条 "key"="value"，允许转义引号，也允许同一行出现多条（模型可能用字面量 \n 分隔）
+_ENTRY_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"\s*=\s*"((?:[^"\\]|\\.)*)"\s*;?')
+
+# 条目之间允许出现的分隔内容：空白、分号，以及模型输出的字面量 \n
+_SEPARATOR_PATTERN = re.compile(r'(?:\s|;|\\n)+')
+
+# 规范化后的key：小写字母、数字、下划线组成的点分路径
+_KEY_PATTERN = re.compile(r'^[a-z0-9_]+(?:\.[a-z0-9_]+)*$')
+
+
+@dataclass(frozen=True)
+class ConfigEntry:
+    """配置项"""
+    key: str
+    value: str
+    line: int = 0
+    known: bool = False
+
+
+@dataclass
+class ParseIssue:
+    """解析过程中被丢弃的内容"""
+    line: int
+    text: str
+    reason: str
+
+
+def normalize_key(key: str) -> str:
+    """
+    规范化配置key
+
+    去除首尾空白、转为小写、将空白和连字符替换为下划线、合并多余的点号
+
+    Args:
+        key: 原始key
+
+    Returns:
+        规范化后的key
+    """
+    key = key.strip().lower()
+    key = re.sub(r'[\s\-]+', '_', key)
+    key = re.sub(r'\.{2,}', '.', key).strip('.')
+    return key
+
+
+def unescape(text: str) -> str:
+    """还原双引号字符串中转义的引号和反斜杠"""
+    return re.sub(r'\\(["\\])', r'\1', text)
+
+
+class ConfigOutputParser:
+    """
+    流式配置输出解析器
+
+    可以按任意分块喂入模型输出，每凑齐一整行即产出该行中的配置项，
+    无效行记录到 issues 中而不是抛出异常
+    """
+
+    def __init__(self):
+        self.issues: List[ParseIssue] = []
+        self._buffer = ""
+        self._line_no = 0
+        self._seen_keys = set()
+
+    def feed(self, chunk: str) -> List[ConfigEntry]:
+        """
+        喂入一段输出
+
+        Args:
+            chunk: 模型输出的片段
+
+        Returns:
+            本次新解析出的配置项
+        """
+        self._buffer += chunk
+        entries: List[ConfigEntry] = []
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            entries.extend(self._parse_line(line))
+        return entries
+
+    def close(self) -> List[ConfigEntry]:
+        """
+        结束解析，处理缓冲区中剩余的最后一行
+
+        Returns:
+            剩余的配置项
+        """
+        line, self._buffer = self._buffer, ""
+        return self._parse_line(line) if line else []
+
+    def _parse_line(self, line: str) -> List[ConfigEntry]:
+        """解析单行内容"""
+        self._line_no += 1
+        text = line.strip().translate(_PUNCTUATION_TABLE)
+
+        # 忽略空行和代码块标记
+        if not text or text.startswith('```'):
+            return []
+
+        entries: List[ConfigEntry] = []
+        matched = False
+        leftover = []
+        position = 0
+        for match in _ENTRY_PATTERN.finditer(text):
+            matched = True
+            leftover.append(text[position:match.start()])
+            position = match.end()
+            entry = self._build_entry(match.group(1), match.group(2), line)
+            if entry:
+                entries.append(entry)
+        leftover.append(text[position:])
+
+        if not matched:
+            self.issues.append(ParseIssue(self._line_no, line, "不符合 \"key\"=\"value\" 格式"))
+        else:
+            # 匹配到的条目之外还有其他内容时，记录下来而不是静默忽略
+            extra = _SEPARATOR_PATTERN.sub(' ', ''.join(f" {part} " for part in leftover)).strip()
+            if extra:
+                self.issues.append(ParseIssue(self._line_no, line, f"行内有无法解析的内容: {extra}"))
+        return entries
+
+    def _build_entry(self, raw_key: str, raw_value: str, line: str) -> Optional[ConfigEntry]:
+        """校验并构造配置项"""
+        key = normalize_key(unescape(raw_key))
+        value = unescape(raw_value).strip()
+
+        if not _KEY_PATTERN.match(key):
+            self.issues.append(ParseIssue(self._line_no, line, f"无效的key: {raw_key}"))
+            return None
+        if not value:
+            self.issues.append(ParseIssue(self._line_no, line, f"key {key} 的值为空"))
+            return None
+        if key in self._seen_keys:
+            self.issues.append(ParseIssue(self._line_no, line, f"重复的key: {key}"))
+            return None
+
+        self._seen_keys.add(key)
+        return ConfigEntry(key=key, value=value, line=self._line_no)
+
+
+def iter_config_entries(chunks: Iterable[str], parser: Optional[ConfigOutputParser] = None) -> Iterator[ConfigEntry]:
+    """
+    从分块的模型输出中逐条产出配置项
+
+    Args:
+        chunks: 模型输出片段序列
+        parser: 解析器实例，传入后可在结束时读取 issues
+
+    Yields:
+        解析出的配置项
+    """
+    parser = parser or ConfigOutputParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_config_output(text: str) -> List[ConfigEntry]:
+    """
+    解析完整的模型输出
+
+    Args:
+        text: 模型输出文本
+
+    Returns:
+        配置项列表
+    """
+    return list(iter_config_entries([text]))
+
+
+def format_config_entries(entries: Iterable[ConfigEntry]) -> str:
+    """
+    将配置项格式化为 "key"="value" 文本
+
+    Args:
+        entries: 配置项
+
+    Returns:
+        每行一条配置的文本
+    """
+    lines = []
+    for entry in entries:
+        value = entry.value.replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'"{entry.key}"="{value}"')
+    return "\n".join(lines)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+按发送者公平调度模块
+
+对上游调用按 发送者+会话 做加权公平排队（基于起始时间的WFQ），
+并限制单个发送者的并发数，避免单个用户的大量请求占满所有上游调用
+"""
+import asyncio
+import functools
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+# 等待时间分布的桶上界（秒）
+WAIT_TIME_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# 超出空闲统计保留数量后，被淘汰发送者的统计合并到此标签下
+OTHER_SENDERS = "_other"
+
+
+@dataclass(eq=False)
+class _Job:
+    """排队中的任务"""
+    start_tag: float
+    finish_tag: float
+    enqueued_at: float
+    future: asyncio.Future
+
+
+@dataclass
+class SenderStats:
+    """单个发送者的调度统计"""
+    queued: int = 0
+    running: int = 0
+    max_queued: int = 0
+    completed: int = 0
+    wait_count: int = 0
+    wait_sum: float = 0.0
+    wait_max: float = 0.0
+    wait_buckets: List[int] = field(default_factory=lambda: [0] * (len(WAIT_TIME_BUCKETS) + 1))
+
+    def observe_wait(self, seconds: float) -> None:
+        """记录一次排队等待时间"""
+        self.wait_count += 1
+        self.wait_sum += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        for i, bound in enumerate(WAIT_TIME_BUCKETS):
+            if seconds <= bound:
+                self.wait_buckets[i] += 1
+                return
+        self.wait_buckets[-1] += 1
+
+    def merge(self, other: 'SenderStats') -> None:
+        """合并另一份统计的累计值"""
+        self.queued += other.queued
+        self.running += other.running
+        self.max_queued = max(self.max_queued, other.max_queued)
+        self.completed += other.completed
+        self.wait_count += other.wait_count
+        self.wait_sum += other.wait_sum
+        self.wait_max = max(self.wait_max, other.wait_max)
+        self.wait_buckets = [a + b for a, b in zip(self.wait_buckets, other.wait_buckets)]
+
+
+@dataclass
+class _SenderState:
+    """单个发送者的调度状态"""
+    weight: float = 1.0
+    last_finish: float = 0.0
+    queue: Deque[_Job] = field(default_factory=deque)
+    stats: SenderStats = field(default_factory=SenderStats)
+
+
+class FairScheduler:
+    """按发送者的加权公平调度器"""
+
+    def __init__(self, max_concurrency: int = 4, per_sender_limit: int = 2, idle_stats_limit: int = 100):
+        if max_concurrency < 1 or per_sender_limit < 1:
+            raise ValueError("并发数必须大于0")
+        self.max_concurrency = max_concurrency
+        self.per_sender_limit = per_sender_limit
+        self.idle_stats_limit = idle_stats_limit
+        # 只保存有排队或运行中任务的发送者，空闲后即回收
+        self._senders: Dict[str, _SenderState] = {}
+        self._weights: Dict[str, float] = {}
+        # 最近空闲的发送者统计，超出数量后合并到 _other_stats
+        self._idle_stats: 'OrderedDict[str, SenderStats]' = OrderedDict()
+        self._other_stats = SenderStats()
+        self._running = 0
+        self._virtual_time = 0.0
+
+    def set_weight(self, sender: str, weight: float) -> None:
+        """
+        设置发送者权重，权重越大分到的上游调用份额越多
+
+        Args:
+            sender: 发送者标识
+            weight: 权重，默认为1
+        """
+        if weight <= 0:
+            raise ValueError("权重必须大于0")
+        self._weights[sender] = weight
+        if sender in self._senders:
+            self._senders[sender].weight = weight
+
+    async def run(self, sender: str, func: Callable[..., Any], *args: Any, cost: float = 1.0) -> Any:
+        """
+        排队并在线程池中执行一次阻塞调用
+
+        Args:
+            sender: 发送者标识
+            func: 阻塞函数
+            *args: 函数参数
+            cost: 本次调用的相对开销
+
+        Returns:
+            函数返回值
+        """
+        await self._acquire(sender, cost)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(func, *args))
+        finally:
+            self._release(sender)
+
+    def stats(self) -> Dict[str, SenderStats]:
+        """
+        返回各发送者的调度统计，可在其他线程（如管理端口）中调用
+
+        包含活跃发送者、最近空闲的发送者，以及合并后的更早发送者（OTHER_SENDERS）
+        """
+        result = dict(list(self._idle_stats.items()))
+        result.update({sender: state.stats for sender, state in list(self._senders.items())})
+        if self._other_stats.wait_count:
+            result[OTHER_SENDERS] = self._other_stats
+        return result
+
+    def render_metrics(self) -> str:
+        """
+        以 Prometheus 文本格式导出各发送者的队列深度和等待时间分布
+
+        Returns:
+            指标文本
+        """
+        lines = [
+            "# TYPE fair_scheduler_queue_depth gauge",
+            "# TYPE fair_scheduler_running gauge",
+            "# TYPE fair_scheduler_max_queue_depth gauge",
+            "# TYPE fair_scheduler_wait_seconds histogram",
+        ]
+        for sender, stats in self.stats().items():
+            label = 'sender="{}"'.format(sender.replace('\\', '\\\\').replace('"', '\\"'))
+            lines.append(f"fair_scheduler_queue_depth{{{label}}} {stats.queued}")
+            lines.append(f"fair_scheduler_running{{{label}}} {stats.running}")
+            lines.append(f"fair_scheduler_max_queue_depth{{{label}}} {stats.max_queued}")
+            cumulative = 0
+            for bound, count in zip(WAIT_TIME_BUCKETS, stats.wait_buckets):
+                cumulative += count
+                lines.append(f'fair_scheduler_wait_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'fair_scheduler_wait_seconds_bucket{{{label},le="+Inf"}} {stats.wait_count}')
+            lines.append(f"fair_scheduler_wait_seconds_sum{{{label}}} {stats.wait_sum:.6f}")
+            lines.append(f"fair_scheduler_wait_seconds_count{{{label}}} {stats.wait_count}")
+        return "\n".join(lines) + "\n"
+
+    def _sender(self, sender: str) -> _SenderState:
+        """获取或创建发送者状态，之前的统计从空闲记录中取回"""
+        state = self._senders.get(sender)
+        if state is None:
+            state = _SenderState(weight=self._weights.get(sender, 1.0))
+            stats = self._idle_stats.pop(sender, None)
+            if stats is not None:
+                state.stats = stats
+            self._senders[sender] = state
+        return state
+
+    def _retire_if_idle(self, sender: str) -> None:
+        """发送者没有排队和运行中的任务时回收其状态，统计转入空闲记录"""
+        state = self._senders.get(sender)
+        if state is None or state.queue or state.stats.running:
+            return
+        del self._senders[sender]
+        self._idle_stats[sender] = state.stats
+        while len(self._idle_stats) > self.idle_stats_limit:
+            _, stats = self._idle_stats.popitem(last=False)
+            self._other_stats.merge(stats)
+
+    async def _acquire(self, sender: str, cost: float) -> None:
+        """排队直到获得执行名额"""
+        state = self._sender(sender)
+        start_tag = max(self._virtual_time, state.last_finish)
+        state.last_finish = start_tag + cost / state.weight
+        job = _Job(start_tag, state.last_finish, time.monotonic(), asyncio.get_running_loop().create_future())
+
+        state.queue.append(job)
+        state.stats.queued += 1
+        state.stats.max_queued = max(state.stats.max_queued, state.stats.queued)
+        self._dispatch()
+
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            if job in state.queue:
+                # 仍在队列中，直接移除
+                state.queue.remove(job)
+                state.stats.queued -= 1
+                self._retire_if_idle(sender)
+            elif not job.future.cancelled():
+                # 已经分到名额，归还
+                self._release(sender)
+            raise
+
+    def _release(self, sender: str) -> None:
+        """归还执行名额并调度下一个任务"""
+        state = self._senders[sender]
+        state.stats.running -= 1
+        state.stats.completed += 1
+        self._running -= 1
+        self._retire_if_idle(sender)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """在空闲名额内按完成标签从小到大放行任务"""
+        while self._running < self.max_concurrency:
+            best: Optional[_SenderState] = None
+            best_sender = ""
+            for sender, state in self._senders.items():
+                if not state.queue or state.stats.running >= self.per_sender_limit:
+                    continue
+                if best is None or state.queue[0].finish_tag < best.queue[0].finish_tag:
+                    best, best_sender = state, sender
+            if best is None:
+                return
+
+            job = best.queue.popleft()
+            best.stats.queued -= 1
+            if job.future.cancelled():
+                self._retire_if_idle(best_sender)
+                continue
+            self._virtual_time = max(self._virtual_time, job.start_tag)
+            best.stats.running += 1
+            best.stats.observe_wait(time.monotonic() - job.enqueued_at)
+            self._running += 1
+            job.future.set_result(None)
@@ -6,6 +6,8 @@ import logging
 import requests
 import json
 import os
+import base64
+import mimetypes
 from typing import Optional
 from openai import OpenAI
 
@@ -34,6 +36,24 @@ class ImageService:
         )
         self.logger.info("千问API密钥已设置")
     
+    @staticmethod
+    def to_image_url(source: str) -> str:
+        """
+        将图片来源转换为可提交给模型的URL
+        
+        Args:
+            source: 图片URL或本地文件路径
+            
+        Returns:
+            原URL，本地文件则转换为 base64 data URL
+        """
+        if source.startswith(('http://', 'https://', 'data:')):
+            return source
+        mime_type = mimetypes.guess_type(source)[0] or 'image/png'
+        with open(source, 'rb') as f:
+            data = base64.b64encode(f.read()).decode('ascii')
+        return f"data:{mime_type};base64,{data}"
+    
     def extract_image_urls(self, text: str) -> dict:
         """
         使用大模型从文本中提取所有图片URL
@@ -97,7 +117,9 @@ class ImageService:
             raise HandlerError("未设置千问API密钥")
             
         try:
-            self.logger.info(f"开始识别图片文字: {image_url}")
+            # 本地文件转换的 data URL 体积很大，只记录开头部分
+            log_url = image_url if not image_url.startswith('data:') else f"{image_url[:40]}..."
+            self.logger.info(f"开始识别图片文字: {log_url}")
             
             completion = self.client.chat.completions.create(
                 model="qwen-vl-plus",
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+已有文案索引模块
+
+从现有的多语言文案文件中建立 文案 -> key 的倒排索引，
+识别出的文案如果已经存在则直接复用其规范key
+"""
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Any
+
+from exceptions import ServiceError
+from services.config_parser import ConfigEntry, unescape
+
+
+# 目录中会被加载的文案文件类型
+LOCALE_FILE_SUFFIXES = ('.json', '.strings', '.txt')
+
+# 文本文案文件中的一行 "key" = "value";，key保持原样，不套用模型输出的key规则
+_LOCALE_LINE_PATTERN = re.compile(r'^"((?:[^"\\]|\\.)*)"\s*=\s*"((?:[^"\\]|\\.)*)"\s*;?$')
+
+
+@dataclass
+class KeyChange:
+    """对账时key被改动的条目"""
+    original_key: str
+    entry: ConfigEntry
+
+
+@dataclass
+class ReconcileResult:
+    """识别结果与已有文案的对账结果"""
+    entries: List[ConfigEntry] = field(default_factory=list)
+    unknown: List[ConfigEntry] = field(default_factory=list)
+    # 文案已存在、key被替换为规范key的条目
+    replaced: List[KeyChange] = field(default_factory=list)
+    # 新文案的key与已有key或前面的条目冲突，改用带后缀的新key的条目
+    renamed: List[KeyChange] = field(default_factory=list)
+    # 同一条已有文案重复出现，被去掉的条目
+    duplicates: List[ConfigEntry] = field(default_factory=list)
+
+    @property
+    def reused_count(self) -> int:
+        """复用已有key的条数"""
+        return len(self.entries) - len(self.unknown)
+
+    @property
+    def all_known(self) -> bool:
+        """是否所有文案都已存在，此时无需再调用模型细化key"""
+        return bool(self.entries) and not self.unknown
+
+
+class LocaleIndex:
+    """已有文案的倒排索引"""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        # 规范化后的文案 -> 使用该文案的key列表，第一个为规范key
+        self._value_to_keys: Dict[str, List[str]] = {}
+        # 所有已有key，新文案不能占用
+        self._keys = set()
+        self._key_count = 0
+
+    def __len__(self) -> int:
+        return self._key_count
+
+    @staticmethod
+    def normalize_value(value: str) -> str:
+        """
+        规范化文案，用于索引和查找
+
+        统一全角/半角字符并合并空白
+        """
+        return " ".join(unicodedata.normalize('NFKC', value).split())
+
+    def add(self, key: str, value: str) -> None:
+        """
+        添加一条已有文案
+
+        key 按文件中的原样保存，只对文案做规范化用于匹配
+
+        Args:
+            key: 文案key
+            value: 文案内容
+        """
+        normalized = self.normalize_value(value)
+        if not normalized:
+            return
+        keys = self._value_to_keys.setdefault(normalized, [])
+        if key not in keys:
+            keys.append(key)
+            self._keys.add(key)
+            self._key_count += 1
+
+    def lookup(self, value: str) -> Optional[str]:
+        """
+        查找文案对应的规范key
+
+        Args:
+            value: 文案内容
+
+        Returns:
+            规范key，不存在时返回None
+        """
+        keys = self._value_to_keys.get(self.normalize_value(value))
+        return keys[0] if keys else None
+
+    def has_key(self, key: str) -> bool:
+        """key 是否已存在于文案文件中"""
+        return key in self._keys
+
+    def keys_for(self, value: str) -> List[str]:
+        """返回使用该文案的所有key"""
+        return list(self._value_to_keys.get(self.normalize_value(value), []))
+
+    def reconcile(self, entries: Iterable[ConfigEntry]) -> ReconcileResult:
+        """
+        将识别结果与已有文案对账，已存在的文案替换为规范key
+
+        同一条已有文案重复出现时只保留第一条；新文案的key如果与已有key或前面的条目冲突，
+        加数字后缀改为新key，保证已有key不会对应到新的文案
+
+        Args:
+            entries: 识别出的配置项
+
+        Returns:
+            对账结果
+        """
+        result = ReconcileResult()
+        used_keys = set()
+        for entry in entries:
+            canonical_key = self.lookup(entry.value)
+            if canonical_key:
+                if canonical_key in used_keys:
+                    result.duplicates.append(entry)
+                    continue
+                if canonical_key != entry.key:
+                    result.replaced.append(KeyChange(entry.key, replace(entry, key=canonical_key, known=True)))
+                entry = replace(entry, key=canonical_key, known=True)
+            else:
+                if entry.key in used_keys or self.has_key(entry.key):
+                    new_key = self._free_key(entry.key, used_keys)
+                    result.renamed.append(KeyChange(entry.key, replace(entry, key=new_key)))
+                    entry = replace(entry, key=new_key)
+                result.unknown.append(entry)
+            used_keys.add(entry.key)
+            result.entries.append(entry)
+        return result
+
+    def _free_key(self, key: str, used_keys: set) -> str:
+        """为冲突的key生成未被占用的带数字后缀的新key"""
+        suffix = 2
+        while f"{key}_{suffix}" in used_keys or self.has_key(f"{key}_{suffix}"):
+            suffix += 1
+        return f"{key}_{suffix}"
+
+    def load_file(self, path: str) -> int:
+        """
+        加载单个文案文件
+
+        支持扁平或嵌套的JSON文件，以及每行 "key"="value"; 格式的文本文件
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            加载的文案条数
+
+        Raises:
+            ServiceError: 当文件无法读取或解析时抛出
+        """
+        before = len(self)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.endswith('.json'):
+                    for key, value in self._flatten_json(json.load(f)):
+                        self.add(key, value)
+                else:
+                    skipped = self._load_lines(f)
+                    if skipped:
+                        self.logger.warning(
+                            f"文案文件 {path} 中有 {len(skipped)} 行无法解析已跳过，"
+                            f"行号: {', '.join(map(str, skipped[:20]))}{' ...' if len(skipped) > 20 else ''}"
+                        )
+        except (OSError, ValueError) as e:
+            raise ServiceError(f"加载文案文件 {path} 失败: {str(e)}")
+        return len(self) - before
+
+    def _load_lines(self, lines: Iterable[str]) -> List[int]:
+        """
+        逐行读取 "key" = "value"; 格式的文案，跳过空行和注释
+
+        Returns:
+            无法解析而被跳过的行号
+        """
+        skipped: List[int] = []
+        in_comment = False
+        for line_no, line in enumerate(lines, 1):
+            text = line.strip()
+            if in_comment:
+                in_comment = '*/' not in text
+                continue
+            if not text or text.startswith(('//', '#')):
+                continue
+            if text.startswith('/*'):
+                in_comment = '*/' not in text
+                continue
+            match = _LOCALE_LINE_PATTERN.match(text)
+            if match:
+                self.add(unescape(match.group(1)), unescape(match.group(2)))
+            else:
+                skipped.append(line_no)
+        return skipped
+
+    def load_paths(self, paths: Iterable[str]) -> int:
+        """
+        加载多个文案文件或目录
+
+        Args:
+            paths: 文件或目录路径
+
+        Returns:
+            加载的文案条数
+        """
+        start_time = time.time()
+        total = 0
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for name in sorted(files):
+                        if name.endswith(LOCALE_FILE_SUFFIXES):
+                            total += self.load_file(os.path.join(root, name))
+            else:
+                total += self.load_file(path)
+        self.logger.info(f"文案索引加载完成，共 {total} 条，耗时: {time.time() - start_time:.3f}s")
+        return total
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str], logger: Optional[logging.Logger] = None) -> 'LocaleIndex':
+        """从文案文件或目录创建索引"""
+        index = cls(logger)
+        index.load_paths(paths)
+        return index
+
+    @staticmethod
+    def _flatten_json(data: Any, prefix: str = ""):
+        """将嵌套的JSON展开为 (点分key, 文案) 序列"""
+        if isinstance(data, dict):
+            for key, value in data.items():
+                yield from LocaleIndex._flatten_json(value, f"{prefix}.{key}" if prefix else str(key))
+        elif isinstance(data, str) and prefix:
+            yield prefix, data
+
+
+def benchmark(size: int = 100000, lookups: int = 100000) -> Dict[str, float]:
+    """
+    测量索引构建和查找耗时
+
+    Args:
+        size: 索引中的文案条数
+        lookups: 查找次数
+
+    Returns:
+        各阶段耗时（秒）
+    """
+    values = [f"文案内容 {i}" for i in range(size)]
+
+    start_time = time.perf_counter()
+    index = LocaleIndex()
+    for i, value in enumerate(values):
+        index.add(f"bench.module_{i % 100}.text_{i}", value)
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for i in range(lookups):
+        index.lookup(values[(i * 7919) % size])
+    hit_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for i in range(lookups):
+        index.lookup(f"不存在的文案 {i}")
+    miss_time = time.perf_counter() - start_time
+
+    return {'build': build_time, 'lookup_hit': hit_time, 'lookup_miss': miss_time}
+
+
+if __name__ == "__main__":
+    import sys
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    timings = benchmark(size, size)
+    print(f"索引条数: {size}")
+    print(f"构建耗时: {timings['build']:.3f}s")
+    print(f"命中查找: {timings['lookup_hit']:.3f}s ({timings['lookup_hit'] / size * 1e6:.2f}us/次)")
+    print(f"未命中查找: {timings['lookup_miss']:.3f}s ({timings['lookup_miss'] / size * 1e6:.2f}us/次)")